@@ -3,340 +3,412 @@
 Unit tests for NordVPN WireGuard Configuration Generator
 """
 
-import unittest
-from unittest.mock import Mock, patch, mock_open, MagicMock
-import json
-import tempfile
-import os
+import pytest
+from functools import partial
+from unittest.mock import patch
+import subprocess
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 import requests
+import requests_mock
 
 # Import the classes to test
 from nordvpn_wireguard_generator import NordVPNWireGuardGenerator
 from config_manager import ConfigManager
 
 
-class TestNordVPNWireGuardGenerator(unittest.TestCase):
+def _freeze(value):
+    """Recursively convert dicts and lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """Recursively convert a frozen sample back into JSON-serializable dicts and lists"""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+# Shared samples, frozen all the way down so tests cannot leak changes into each other
+SAMPLE_SERVER = _freeze({
+    'hostname': 'us1234.nordvpn.com',
+    'station': '192.168.1.100',
+    'load': 25,
+    'locations': [{'country': {'name': 'United States', 'code': 'US'}}],
+    'technologies': [{'identifier': 'wireguard_udp'}]
+})
+SAMPLE_COUNTRIES = _freeze([
+    {'code': 'US', 'name': 'United States'},
+    {'code': 'UK', 'name': 'United Kingdom'},
+    {'code': 'DE', 'name': 'Germany'}
+])
+
+# Preallocated subprocess.run results
+SUCCESS = SimpleNamespace(returncode=0, stdout="", stderr="")
+FAILURE = SimpleNamespace(returncode=1, stdout="", stderr="Error message")
+
+
+@pytest.fixture(scope="class")
+def generator():
+    return NordVPNWireGuardGenerator()
+
+
+def _register_responses(mocker, api_base):
+    mocker.get(f"{api_base}/v1/servers", json=[_thaw(SAMPLE_SERVER)])
+    mocker.get(f"{api_base}/v1/servers/countries", json=_thaw(SAMPLE_COUNTRIES))
+
+
+@pytest.fixture(scope="class")
+def _api_mocker(generator):
+    """Intercept requests at the transport level for the whole class, with
+    the sample API responses registered once"""
+    with requests_mock.Mocker(case_sensitive=True) as mocker:
+        _register_responses(mocker, generator.api_base)
+        yield mocker
+
+
+@pytest.fixture
+def api(_api_mocker):
+    _api_mocker.reset_mock()
+    return _api_mocker
+
+
+# Patch subprocess once per class instead of per test
+@pytest.fixture(scope="class")
+def _check_output_patch():
+    with patch('subprocess.check_output') as mock:
+        yield mock
+
+
+@pytest.fixture
+def check_output(_check_output_patch):
+    _check_output_patch.reset_mock(return_value=True, side_effect=True)
+    return _check_output_patch
+
+
+@pytest.fixture(scope="class")
+def _run_patch():
+    with patch('subprocess.run') as mock:
+        yield mock
+
+
+@pytest.fixture
+def run(_run_patch):
+    _run_patch.reset_mock(side_effect=True)
+    _run_patch.return_value = SUCCESS
+    return _run_patch
+
+
+@pytest.fixture(scope="class")
+def tmp_config_dir(fs_class):
+    """In-memory filesystem holding the sample configs, shared by the class"""
+    temp_dir = "/tmp/configs"
+    config_dir = Path(temp_dir)
     
-    def setUp(self):
-        self.generator = NordVPNWireGuardGenerator()
-        self.sample_server = {
-            'hostname': 'us1234.nordvpn.com',
-            'station': '192.168.1.100',
-            'load': 25,
-            'locations': [{'country': {'name': 'United States', 'code': 'US'}}],
-            'technologies': [{'identifier': 'wireguard_udp'}]
-        }
-        self.sample_countries = [
-            {'code': 'US', 'name': 'United States'},
-            {'code': 'UK', 'name': 'United Kingdom'},
-            {'code': 'DE', 'name': 'Germany'}
-        ]
+    # Create sample config files; no test modifies them
+    fs_class.create_file(config_dir / "server1.conf", contents="[Interface]\nPrivateKey = key1")
+    fs_class.create_file(config_dir / "server2.conf", contents="[Interface]\nPrivateKey = key2")
+    return temp_dir
+
+
+@pytest.fixture(scope="class")
+def empty_config_dir(fs_class):
+    """Known-empty directory on the class's in-memory filesystem"""
+    empty_dir = "/tmp/empty"
+    fs_class.create_dir(empty_dir)
+    return empty_dir
+
+
+@pytest.fixture
+def manager(tmp_config_dir, run):
+    manager = ConfigManager(tmp_config_dir)
+    manager.active_config = None
+    return manager
+
+
+class TestNordVPNWireGuardGenerator:
     
-    @patch('requests.get')
-    def test_get_servers_success(self, mock_get):
+    def test_get_servers_success(self, generator, api):
         """Test successful server retrieval"""
-        mock_response = Mock()
-        mock_response.json.return_value = [self.sample_server]
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-        
-        servers = self.generator.get_servers(country='US', limit=5)
+        servers = generator.get_servers(country='US', limit=5)
         
-        self.assertEqual(len(servers), 1)
-        self.assertEqual(servers[0]['hostname'], 'us1234.nordvpn.com')
-        mock_get.assert_called_once()
+        assert len(servers) == 1
+        assert servers[0]['hostname'] == 'us1234.nordvpn.com'
+        assert api.call_count == 1
         
         # Verify correct API parameters
-        call_args = mock_get.call_args
-        self.assertIn('filters[country_code]', call_args[1]['params'])
-        self.assertEqual(call_args[1]['params']['filters[country_code]'], 'US')
-        self.assertEqual(call_args[1]['params']['limit'], 5)
+        params = api.last_request.qs
+        assert 'filters[country_code]' in params
+        assert params['filters[country_code]'] == ['US']
+        assert params['limit'] == ['5']
     
-    @patch('requests.get')
-    def test_get_servers_no_country_filter(self, mock_get):
+    def test_get_servers_no_country_filter(self, generator, api):
         """Test server retrieval without country filter"""
-        mock_response = Mock()
-        mock_response.json.return_value = [self.sample_server]
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        servers = generator.get_servers(limit=10)
         
-        servers = self.generator.get_servers(limit=10)
-        
-        call_args = mock_get.call_args
-        self.assertNotIn('filters[country_code]', call_args[1]['params'])
-        self.assertEqual(call_args[1]['params']['limit'], 10)
+        params = api.last_request.qs
+        assert 'filters[country_code]' not in params
+        assert params['limit'] == ['10']
     
-    @patch('requests.get')
-    def test_get_servers_request_exception(self, mock_get):
+    def test_get_servers_request_exception(self, generator, api, request):
         """Test server retrieval with network error"""
-        mock_get.side_effect = requests.RequestException("Network error")
+        api.get(f"{generator.api_base}/v1/servers", exc=requests.RequestException)
+        request.addfinalizer(partial(_register_responses, api, generator.api_base))
         
-        servers = self.generator.get_servers()
+        servers = generator.get_servers()
         
-        self.assertEqual(servers, [])
+        assert servers == []
     
-    @patch('requests.get')
-    def test_get_countries_success(self, mock_get):
+    def test_get_countries_success(self, generator, api):
         """Test successful countries retrieval"""
-        mock_response = Mock()
-        mock_response.json.return_value = self.sample_countries
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-        
-        countries = self.generator.get_countries()
+        countries = generator.get_countries()
         
-        self.assertEqual(len(countries), 3)
-        self.assertEqual(countries[0]['code'], 'US')
-        mock_get.assert_called_once_with(f"{self.generator.api_base}/v1/servers/countries")
+        assert len(countries) == 3
+        assert countries[0]['code'] == 'US'
+        assert api.call_count == 1
+        assert api.last_request.url == f"{generator.api_base}/v1/servers/countries"
     
-    @patch('requests.get')
-    def test_get_countries_request_exception(self, mock_get):
+    def test_get_countries_request_exception(self, generator, api, request):
         """Test countries retrieval with network error"""
-        mock_get.side_effect = requests.RequestException("API error")
+        api.get(f"{generator.api_base}/v1/servers/countries", exc=requests.RequestException)
+        request.addfinalizer(partial(_register_responses, api, generator.api_base))
         
-        countries = self.generator.get_countries()
+        countries = generator.get_countries()
         
-        self.assertEqual(countries, [])
+        assert countries == []
     
-    @patch('subprocess.check_output')
-    def test_generate_keys_success(self, mock_subprocess):
+    def test_generate_keys_success(self, generator, check_output):
         """Test successful key generation"""
-        mock_subprocess.side_effect = [
+        check_output.side_effect = [
             'private_key_here\n',  # First call for private key
             'public_key_here\n'    # Second call for public key
         ]
         
-        private_key, public_key = self.generator.generate_keys()
+        private_key, public_key = generator.generate_keys()
         
-        self.assertEqual(private_key, 'private_key_here')
-        self.assertEqual(public_key, 'public_key_here')
-        self.assertEqual(mock_subprocess.call_count, 2)
+        assert private_key == 'private_key_here'
+        assert public_key == 'public_key_here'
+        assert check_output.call_count == 2
     
-    @patch('subprocess.check_output')
-    def test_generate_keys_subprocess_error(self, mock_subprocess):
+    def test_generate_keys_subprocess_error(self, generator, check_output):
         """Test key generation with subprocess error"""
-        mock_subprocess.side_effect = subprocess.CalledProcessError(1, 'wg')
+        check_output.side_effect = subprocess.CalledProcessError(1, 'wg')
         
-        with self.assertRaises(SystemExit):
-            self.generator.generate_keys()
+        with pytest.raises(SystemExit):
+            generator.generate_keys()
     
-    @patch('subprocess.check_output')
-    def test_generate_keys_file_not_found(self, mock_subprocess):
+    def test_generate_keys_file_not_found(self, generator, check_output):
         """Test key generation when WireGuard not installed"""
-        mock_subprocess.side_effect = FileNotFoundError()
+        check_output.side_effect = FileNotFoundError()
         
-        with self.assertRaises(SystemExit):
-            self.generator.generate_keys()
+        with pytest.raises(SystemExit):
+            generator.generate_keys()
     
-    def test_create_config_success(self):
-        """Test successful configuration creation"""
-        private_key = "test_private_key"
-        dns = "1.1.1.1,8.8.8.8"
-        
-        config = self.generator.create_config(self.sample_server, private_key, dns)
-        
-        self.assertIn(private_key, config)
-        self.assertIn(dns, config)
-        self.assertIn(self.sample_server['station'], config)
-        self.assertIn(self.generator.nordlynx_public_key, config)
-        self.assertIn("10.5.0.2/32", config)
-        self.assertIn("51820", config)
-    
-    def test_create_config_no_wireguard_tech(self):
-        """Test configuration creation with server missing WireGuard support"""
-        server_no_wg = {
+    @pytest.mark.parametrize("server, expected, match", [
+        pytest.param(SAMPLE_SERVER, None, None, id="success"),
+        pytest.param({
             'hostname': 'test.nordvpn.com',
             'station': '192.168.1.100',
             'technologies': [{'identifier': 'openvpn_udp'}]  # No WireGuard
-        }
-        
-        with self.assertRaises(ValueError) as context:
-            self.generator.create_config(server_no_wg, "test_key")
-        
-        self.assertIn("No WireGuard endpoint found", str(context.exception))
-    
-    def test_create_config_empty_technologies(self):
-        """Test configuration creation with server having no technologies"""
-        server_no_tech = {
+        }, ValueError, "No WireGuard endpoint found", id="no_wireguard_tech"),
+        pytest.param({
             'hostname': 'test.nordvpn.com',
             'station': '192.168.1.100',
             'technologies': []
-        }
+        }, ValueError, None, id="empty_technologies"),
+    ])
+    def test_create_config(self, generator, server, expected, match):
+        """Test configuration creation with and without WireGuard support"""
+        if expected is not None:
+            with pytest.raises(expected, match=match):
+                generator.create_config(server, "test_key")
+            return
         
-        with self.assertRaises(ValueError):
-            self.generator.create_config(server_no_tech, "test_key")
+        private_key = "test_private_key"
+        dns = "1.1.1.1,8.8.8.8"
+        
+        config = generator.create_config(server, private_key, dns)
+        
+        expected_parts = (
+            private_key,
+            dns,
+            server['station'],
+            generator.nordlynx_public_key,
+            "10.5.0.2/32",
+            "51820",
+        )
+        missing = [part for part in expected_parts if part not in config]
+        assert not missing
     
     @patch('pathlib.Path.write_text')
-    def test_save_config(self, mock_write_text):
+    def test_save_config(self, mock_write_text, generator):
         """Test configuration file saving"""
         config_content = "[Interface]\nPrivateKey = test"
         filename = "test.conf"
         
-        self.generator.save_config(config_content, filename)
+        generator.save_config(config_content, filename)
         
         mock_write_text.assert_called_once_with(config_content)
     
     @patch('nordvpn_wireguard_generator.NordVPNWireGuardGenerator.get_countries')
     @patch('builtins.print')
-    def test_list_countries_success(self, mock_print, mock_get_countries):
+    def test_list_countries_success(self, mock_print, mock_get_countries, generator):
         """Test listing countries successfully"""
-        mock_get_countries.return_value = self.sample_countries
+        mock_get_countries.return_value = _thaw(SAMPLE_COUNTRIES)
         
-        self.generator.list_countries()
+        generator.list_countries()
         
         # Verify print was called with country information
-        print_calls = [call[0][0] for call in mock_print.call_args_list]
-        self.assertTrue(any("Available countries:" in call for call in print_calls))
-        self.assertTrue(any("US: United States" in call for call in print_calls))
+        needed = {"Available countries:", "US: United States"}
+        for call in mock_print.call_args_list:
+            needed -= {text for text in needed if text in call.args[0]}
+        assert not needed
     
     @patch('nordvpn_wireguard_generator.NordVPNWireGuardGenerator.get_countries')
     @patch('builtins.print')
-    def test_list_countries_failure(self, mock_print, mock_get_countries):
+    def test_list_countries_failure(self, mock_print, mock_get_countries, generator):
         """Test listing countries with API failure"""
         mock_get_countries.return_value = []
         
-        self.generator.list_countries()
+        generator.list_countries()
         
         mock_print.assert_called_with("Failed to fetch countries list")
 
 
-class TestConfigManager(unittest.TestCase):
+class TestConfigManager:
     
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.manager = ConfigManager(self.temp_dir)
-        
-        # Create sample config files
-        self.config1_path = Path(self.temp_dir) / "server1.conf"
-        self.config2_path = Path(self.temp_dir) / "server2.conf"
-        self.config1_path.write_text("[Interface]\nPrivateKey = key1")
-        self.config2_path.write_text("[Interface]\nPrivateKey = key2")
-    
-    def tearDown(self):
-        # Clean up temp directory
-        import shutil
-        shutil.rmtree(self.temp_dir)
-    
-    def test_list_configs(self):
+    def test_list_configs(self, manager):
         """Test listing available configurations"""
-        configs = self.manager.list_configs()
+        configs = manager.list_configs()
         
-        self.assertEqual(len(configs), 2)
-        self.assertIn("server1", configs)
-        self.assertIn("server2", configs)
-        self.assertEqual(configs, sorted(configs))  # Should be sorted
+        assert len(configs) == 2
+        assert "server1" in configs
+        assert "server2" in configs
+        assert configs == sorted(configs)  # Should be sorted
     
-    def test_list_configs_empty_directory(self):
+    def test_list_configs_empty_directory(self, empty_config_dir):
         """Test listing configs in empty directory"""
-        empty_manager = ConfigManager(tempfile.mkdtemp())
+        empty_manager = ConfigManager(empty_config_dir)
         configs = empty_manager.list_configs()
         
-        self.assertEqual(configs, [])
+        assert configs == []
     
-    @patch('subprocess.run')
-    def test_activate_config_success(self, mock_subprocess):
+    def test_activate_config_success(self, manager, run):
         """Test successful configuration activation"""
-        mock_subprocess.return_value = Mock(returncode=0)
+        run.return_value = SUCCESS
         
-        result = self.manager.activate_config("server1")
+        result = manager.activate_config("server1")
         
-        self.assertTrue(result)
-        self.assertEqual(self.manager.active_config, "server1")
-        self.assertEqual(mock_subprocess.call_count, 2)  # down + up commands
+        assert result
+        assert manager.active_config == "server1"
+        assert run.call_count == 2  # down + up commands
     
-    @patch('subprocess.run')
-    def test_activate_config_failure(self, mock_subprocess):
+    def test_activate_config_failure(self, manager, run):
         """Test configuration activation failure"""
-        mock_subprocess.return_value = Mock(returncode=1, stderr="Error message")
+        run.return_value = FAILURE
         
-        result = self.manager.activate_config("server1")
+        result = manager.activate_config("server1")
         
-        self.assertFalse(result)
-        self.assertIsNone(self.manager.active_config)
+        assert not result
+        assert manager.active_config is None
     
-    def test_activate_config_not_found(self):
+    def test_activate_config_not_found(self, manager):
         """Test activating non-existent configuration"""
-        result = self.manager.activate_config("nonexistent")
+        result = manager.activate_config("nonexistent")
         
-        self.assertFalse(result)
+        assert not result
     
-    @patch('subprocess.run')
-    def test_activate_config_subprocess_error(self, mock_subprocess):
+    def test_activate_config_subprocess_error(self, manager, run):
         """Test activation with subprocess exception"""
-        mock_subprocess.side_effect = subprocess.CalledProcessError(1, 'wg-quick')
+        run.side_effect = subprocess.CalledProcessError(1, 'wg-quick')
         
-        result = self.manager.activate_config("server1")
+        result = manager.activate_config("server1")
         
-        self.assertFalse(result)
+        assert not result
     
-    @patch('subprocess.run')
-    def test_deactivate_config_success(self, mock_subprocess):
+    def test_deactivate_config_success(self, manager, run):
         """Test successful configuration deactivation"""
-        mock_subprocess.return_value = Mock(returncode=0)
-        self.manager.active_config = "server1"
+        run.return_value = SUCCESS
+        manager.active_config = "server1"
         
-        result = self.manager.deactivate_config()
+        result = manager.deactivate_config()
         
-        self.assertTrue(result)
-        self.assertIsNone(self.manager.active_config)
+        assert result
+        assert manager.active_config is None
     
-    @patch('subprocess.run')
-    def test_deactivate_config_failure(self, mock_subprocess):
+    def test_deactivate_config_failure(self, manager, run):
         """Test configuration deactivation failure"""
-        mock_subprocess.return_value = Mock(returncode=1, stderr="Deactivation error")
+        run.return_value = FAILURE
         
-        result = self.manager.deactivate_config()
+        result = manager.deactivate_config()
         
-        self.assertFalse(result)
+        assert not result
     
-    @patch('subprocess.run')
-    def test_get_status_active(self, mock_subprocess):
+    def test_get_status_active(self, manager, run):
         """Test getting status when VPN is active"""
-        mock_subprocess.return_value = Mock(
+        run.return_value = SimpleNamespace(
             returncode=0,
-            stdout="interface: wg0\n  public key: abc123\n"
+            stdout="interface: wg0\n  public key: abc123\n",
+            stderr=""
         )
         
-        status = self.manager.get_status()
+        status = manager.get_status()
         
-        self.assertTrue(status['active'])
-        self.assertIn("interface: wg0", status['details'])
+        assert status['active']
+        assert "interface: wg0" in status['details']
     
-    @patch('subprocess.run')
-    def test_get_status_inactive(self, mock_subprocess):
+    def test_get_status_inactive(self, manager, run):
         """Test getting status when VPN is inactive"""
-        mock_subprocess.return_value = Mock(returncode=0, stdout="")
+        run.return_value = SUCCESS
         
-        status = self.manager.get_status()
+        status = manager.get_status()
         
-        self.assertFalse(status['active'])
-        self.assertEqual(status['details'], "No active connections")
+        assert not status['active']
+        assert status['details'] == "No active connections"
     
-    @patch('subprocess.run')
-    def test_get_status_error(self, mock_subprocess):
+    def test_get_status_error(self, manager, run):
         """Test getting status with subprocess error"""
-        mock_subprocess.side_effect = subprocess.CalledProcessError(1, 'wg')
+        run.side_effect = subprocess.CalledProcessError(1, 'wg')
         
-        status = self.manager.get_status()
+        status = manager.get_status()
         
-        self.assertFalse(status['active'])
-        self.assertEqual(status['details'], "Error checking status")
+        assert not status['active']
+        assert status['details'] == "Error checking status"
 
 
-class TestIntegration(unittest.TestCase):
+@pytest.mark.integration
+class TestIntegration:
     """Integration tests combining multiple components"""
     
     @patch('subprocess.check_output')
-    @patch('requests.get')
-    def test_full_config_generation_workflow(self, mock_requests, mock_subprocess):
+    def test_full_config_generation_workflow(self, mock_subprocess, requests_mock):
         """Test complete workflow from server fetch to config generation"""
+        generator = NordVPNWireGuardGenerator()
+        
         # Mock API response
-        mock_response = Mock()
-        mock_response.json.return_value = [{
+        requests_mock.get(f"{generator.api_base}/v1/servers", json=[{
             'hostname': 'integration-test.nordvpn.com',
             'station': '10.0.0.1',
             'load': 15,
             'locations': [{'country': {'name': 'Test Country', 'code': 'TC'}}],
             'technologies': [{'identifier': 'wireguard_udp'}]
-        }]
\ No newline at end of file
+        }])
+        mock_subprocess.side_effect = ['private_key_here\n', 'public_key_here\n']
+        
+        servers = generator.get_servers(country='TC')
+        private_key, _ = generator.generate_keys()
+        config = generator.create_config(servers[0], private_key)
+        
+        assert servers[0]['hostname'] == 'integration-test.nordvpn.com'
+        assert 'private_key_here' in config
+        assert '10.0.0.1' in config
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__]))